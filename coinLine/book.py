@@ -0,0 +1,266 @@
+# book.py
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: flushes from several processes are not serialized
+    fcntl = None
+
+"""
+Persistent store of solved coin windows (an "opening book") shared across sessions.
+
+Every record maps a hash of (max_take, remaining coins) to the best action and the
+margin the player to move gets with it. Because the key is the window's content, a
+sub-window solved while playing one board also answers any other board that
+reaches the same line of coins.
+
+File format (little endian): a 16-byte header
+    magic b"CLBK", version u16, record size u16, reserved u64
+followed by segments, each a record count u64 and that many fixed-size records sorted by key
+    key 16 bytes (blake2b), margin i64, side u8 (0 = 'L', 1 = 'R'), take u16
+The file is memory-mapped on load and every segment is searched by bisection, newest
+first, so opening it costs nothing and a lookup touches ~log2(n) records per segment.
+
+New entries are kept in memory until flush(), which appends them as one new sorted
+segment, so a flush costs O(new entries) whatever the size of the book. Segments are
+kept shrinking geometrically: while the new segment (plus whatever was merged into it)
+holds at least 1/MERGE_RATIO of the records of the one before, the two are merged (by
+writing a new file next to the book and atomically replacing it). That leaves O(log n)
+segments and rewrites every record O(log n) times overall, but the rare flush that merges
+everything still rewrites the whole book (~1.4 s at 2M records), so interactive callers
+should use flush_async(), which runs the same work in a background thread.
+Flushes from several processes are serialized by a lock file (path + ".lock"); a segment
+cut short by a crash is ignored and overwritten by the next flush.
+
+Only boards of at most MAX_COINS coins are stored (every window of one is ~MAX_COINS^2/2
+records and ~MAX_COINS^3/6 coins hashed, so the cost grows quickly with the board), and
+get() answers None for longer windows without hashing them. Larger boards, such as the
+thousand-coin boards max_take allows, are left to the in-memory memo of coinline.
+
+Version 1 books (one sorted run, record count in the header) are still read and are
+rewritten as version 2 on their first flush.
+"""
+
+MAGIC = b"CLBK"
+VERSION = 2
+HEADER = struct.Struct("<4sHHQ")
+SEGMENT = struct.Struct("<Q")
+RECORD = struct.Struct("<16sqBH")
+MERGE_RATIO = 4
+MAX_COINS = 64      # largest board written to (and window looked up in) the book
+
+
+def window_key(coins, max_take):
+    h = hashlib.blake2b(struct.pack("<I", max_take), digest_size=16)
+    h.update(array("q", coins).tobytes())
+    return h.digest()
+
+
+def _scan(buf):
+    # (version, [(offset of first record, count)], end of the last complete segment)
+    magic, version, size, count = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version not in (1, VERSION) or size != RECORD.size:
+        raise ValueError("bad header")
+    if version == 1:
+        return version, [(HEADER.size, count)], HEADER.size + count * RECORD.size
+    segments, offset = [], HEADER.size
+    while offset + SEGMENT.size <= len(buf):
+        (count,) = SEGMENT.unpack_from(buf, offset)
+        end = offset + SEGMENT.size + count * RECORD.size
+        if end > len(buf):
+            break
+        segments.append((offset + SEGMENT.size, count))
+        offset = end
+    return version, segments, offset
+
+@contextmanager
+def _locked(path):
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.path = path
+        self.pending = {}
+        self._flushing = {}                 # entries being written by flush()
+        self._lock = threading.Lock()       # guards pending/_flushing and the mapping
+        self._flush_lock = threading.Lock() # one flush at a time in this process
+        self._threads = []
+        self._file = None
+        self._map = None
+        self._segments = []
+        self._open()
+
+    def _open(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) <= HEADER.size:
+            return
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            _, self._segments, _ = _scan(self._map)
+        except ValueError:
+            self._close_map()
+            raise ValueError(f"{self.path} is not a coinline opening book (version {VERSION})")
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = self._file = None
+        self._segments = []
+
+    def __len__(self):
+        # Records on disk (a key rewritten in a newer segment counts twice) plus pending ones.
+        return sum(count for _, count in self._segments) + len(self.pending) + len(self._flushing)
+
+    def _lookup(self, key):
+        for start, count in reversed(self._segments):
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._map[start + mid * RECORD.size:start + mid * RECORD.size + 16] < key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo < count:
+                rec_key, margin, side, take = RECORD.unpack_from(self._map, start + lo * RECORD.size)
+                if rec_key == key:
+                    return margin, side, take
+        return None
+
+    def get(self, coins, max_take):
+        # (best action, margin for the player to move) for the window, or None.
+        if len(coins) > MAX_COINS:
+            return None
+        key = window_key(coins, max_take)
+        with self._lock:
+            entry = self.pending.get(key) or self._flushing.get(key)
+            if entry is None and self._map is not None:
+                entry = self._lookup(key)
+        if entry is None:
+            return None
+        margin, side, take = entry
+        return ('L' if side == 0 else 'R', take), margin
+
+    def put(self, coins, max_take, action, margin):
+        side, take = action
+        with self._lock:
+            self.pending[window_key(coins, max_take)] = (margin, 0 if side == 'L' else 1, take)
+
+    def add_solved(self, table):
+        # Stores every window of a coinline.SolvedBoard of at most MAX_COINS coins.
+        board, k = table.board, table.max_take
+        if len(board) > MAX_COINS:
+            return
+        entries = {}
+        for lo in range(len(board)):
+            for hi in range(lo + 1, len(board) + 1):
+                side, take = table.best_action(lo, hi)
+                entries[window_key(board[lo:hi], k)] = (table.value(lo, hi), 0 if side == 'L' else 1, take)
+        with self._lock:
+            self.pending.update(entries)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self.pending:
+                    return
+                self._flushing, self.pending = self.pending, {}
+            try:
+                records = [RECORD.pack(key, *self._flushing[key]) for key in sorted(self._flushing)]
+                with _locked(self.path + ".lock"):
+                    self._write(records)
+            except BaseException:
+                with self._lock:
+                    self._flushing.update(self.pending)
+                    self.pending, self._flushing = self._flushing, {}
+                raise
+            with self._lock:
+                self._close_map()
+                self._open()
+                self._flushing = {}
+
+    def flush_async(self):
+        # flush() in a background thread, e.g. at the end of a game in the UI loop.
+        self._threads = [t for t in self._threads if t.is_alive()]
+        thread = threading.Thread(target=self.flush)
+        thread.start()
+        self._threads.append(thread)
+
+    def _write(self, records):
+        # Appends `records` (sorted, packed) as a new segment of the file on disk, merging
+        # tail segments as needed. Runs under the lock file; another process may have
+        # changed the file since it was mapped here, so it is scanned again.
+        if not os.path.exists(self.path) or os.path.getsize(self.path) <= HEADER.size:
+            self._replace(b"", [records])
+            return
+        with open(self.path, "r+b") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                version, segments, end = _scan(buf)
+                merge = len(segments) if version == 1 else 0
+                total = len(records)
+                while merge < len(segments) and total * MERGE_RATIO >= segments[-1 - merge][1]:
+                    total += segments[-1 - merge][1]
+                    merge += 1
+                if merge:
+                    keep = segments[-merge][0] - SEGMENT.size if version != 1 else HEADER.size
+                    runs = [[buf[o:o + RECORD.size] for o in range(start, start + count * RECORD.size, RECORD.size)]
+                            for start, count in segments[-merge:]]
+                    self._replace(buf[HEADER.size:keep], runs + [records])
+                    return
+            finally:
+                buf.close()
+            f.truncate(end)
+            f.seek(end)
+            f.write(SEGMENT.pack(len(records)))
+            f.writelines(records)
+
+    def _replace(self, head, runs):
+        # Writes header + head + one segment merging `runs` (oldest first, newer entries win)
+        # to a temporary file in the book's directory and moves it over the book.
+        merged = {}
+        for run in runs:
+            merged.update((rec[:16], rec) for rec in run)
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp",
+                                   dir=os.path.dirname(os.path.abspath(self.path)))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+                f.write(head)
+                f.write(SEGMENT.pack(len(merged)))
+                f.writelines(sorted(merged.values()))   # keys are unique: sorts by key
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def close(self):
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.flush()
+        self._close_map()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,11 +1,70 @@
 # coinline.py
 
+from array import array
+from collections import OrderedDict, deque
+
+# Default maximum number of coins a player may pick from one side per turn.
+MAX_TAKE = 2
+
+
+"""
+The board is stored once per game (``board`` and its prefix sums ``prefix``) and shared by
+every successor state; a state is the window board[lo:hi] of coins still on the line. The sum
+of any run of coins is prefix[b] - prefix[a], so every move is scored in O(1).
+
+``max_take`` is k, the maximum number of coins that can be picked per turn.
+"""
 class State:
-    def __init__(self, coins, pScore=0, aiScore=0, turn='player'): 
-        self.coins = coins
+    def __init__(self, coins, pScore=0, aiScore=0, turn='player', max_take=MAX_TAKE):
+        self.board = tuple(coins)
+        self.prefix = prefix_sums(self.board)
+        self.lo = 0
+        self.hi = len(self.board)
         self.pScore = pScore
         self.aiScore = aiScore
         self.turn = turn
+        self.max_take = check_max_take(max_take)
+
+    @classmethod
+    def window(cls, parent, lo, hi, pScore, aiScore, turn):
+        # Successor sharing the parent's board and prefix sums.
+        state = cls.__new__(cls)
+        state.board = parent.board
+        state.prefix = parent.prefix
+        state.lo = lo
+        state.hi = hi
+        state.pScore = pScore
+        state.aiScore = aiScore
+        state.turn = turn
+        state.max_take = parent.max_take
+        return state
+
+    @property
+    def coins(self):
+        return list(self.board[self.lo:self.hi])
+
+
+def check_max_take(max_take):
+    if isinstance(max_take, bool) or not isinstance(max_take, int) or max_take < 1:
+        raise ValueError(f"max_take must be an integer >= 1, got {max_take!r}")
+    return max_take
+
+
+def is_valid_action(action, max_take, remaining):
+    # ('L' | 'R', t) with t an int (not a bool) from 1 to min(max_take, remaining)
+    try:
+        side, t = action
+    except (TypeError, ValueError):
+        return False
+    return side in ('L', 'R') and isinstance(t, int) and not isinstance(t, bool) \
+        and 1 <= t <= min(max_take, remaining)
+
+
+def prefix_sums(coins):
+    prefix = [0]
+    for c in coins:
+        prefix.append(prefix[-1] + c)
+    return prefix
 
 
 """
@@ -26,32 +85,15 @@ Returns the set of all possible actions available on the line of coins.
 The actions function should return a list of all the possible actions that can be taken given a state.
 
 Each action should be represented as a tuple (i, j) where i corresponds to the side of the line ('L', 'R')
-and j corresponds to the number of coins to be picked (1, 2).
+and j corresponds to the number of coins to be picked (1 .. state.max_take).
 
 Possible moves depend on the numner of coins left.
 
 Any return value is acceptable if there are no coins left.
 """
 def actions(state):
-    possible_actions = []
-    coins_left = len(state.coins)
-
-    if coins_left == 0:
-        return possible_actions
-
-    # Choose from Left side
-    if coins_left >= 1:
-        possible_actions.append(('L', 1))
-    if coins_left >= 2:
-        possible_actions.append(('L', 2))
-
-    # Choose from right side
-    if coins_left >= 1:
-        possible_actions.append(('R', 1))
-    if coins_left >= 2:
-        possible_actions.append(('R', 2))
-
-    return possible_actions
+    takes = range(1, min(state.max_take, state.hi - state.lo) + 1)
+    return [('L', j) for j in takes] + [('R', j) for j in takes]
 
 """
 Returns the line of coins that results from taking action (i, j), without modifying the 
@@ -63,40 +105,26 @@ The returned state should be the line of coins and scores that would result from
 original input state, and letting the player whose turn it is pick the coin(s) indicated by the 
 input action.
 
-Importantly, the original state should be left unmodified. This means that simply updating the 
-input state itself is not a correct implementation of this function. You’ll likely want to make a 
-deep copy of the state first before making any changes.
+Importantly, the original state should be left unmodified. The successor shares the
+board and prefix sums and only moves the window bounds, so this is O(1).
 """
 def succ(state, action):
-
-    if action not in actions(state):
+    if not is_valid_action(action, state.max_take, state.hi - state.lo):
         raise ValueError(f"Invalid action: {action} for current state")
-
-
-    new_coins = state.coins.copy()
-    new_pScore = state.pScore
-    new_aiScore = state.aiScore
-
     side, num_coins = action
 
-    # Calculating score for the move
-    score = 0
+    lo, hi = state.lo, state.hi
     if side == 'L':
-        for i in range(num_coins):
-            score += new_coins.pop(0)  # Remove from left
+        score = state.prefix[lo + num_coins] - state.prefix[lo]
+        lo += num_coins
     else:  # side == 'R'
-        for i in range(num_coins):
-            score += new_coins.pop()  # Remove from right
+        score = state.prefix[hi] - state.prefix[hi - num_coins]
+        hi -= num_coins
 
     # Update the score based on whose turn it is
     if state.turn == 'player':
-        new_pScore += score
-        new_turn = 'ai'
-    else:
-        new_aiScore += score
-        new_turn = 'player'
-
-    return State(new_coins, new_pScore, new_aiScore, new_turn)
+        return State.window(state, lo, hi, state.pScore + score, state.aiScore, 'ai')
+    return State.window(state, lo, hi, state.pScore, state.aiScore + score, 'player')
 
 
 """
@@ -107,7 +135,7 @@ If the game is over when there are no coins left.
 Otherwise, the function should return False if the game is still in progress.
 """
 def terminal(state):
-    return len(state.coins) == 0
+    return state.lo == state.hi
 
 """
 Returns the scores of the two players.
@@ -140,48 +168,182 @@ def winner(state):
         return None
 
 
+"""
+Solves every window of a board at once and returns a SolvedBoard.
+
+V(i, j) is the best margin (own score minus opponent's) the player to move can get on
+board[i:j]. Taking t coins from the left is worth P[i+t] - P[i] - V(i+t, j), so for a fixed j
+the best left move is max over m in (i, i+k] of (P[m] - V(m, j)) minus P[i]: a sliding window
+maximum as i decreases. The right side is the same for a fixed i as j increases. With one
+monotonic deque per j (left moves) and one per i (right moves) every window is solved in
+amortized O(1), so the whole board takes O(n^2) time instead of O(n^2 * k).
+
+Ties are broken like the move order of actions(): fewest coins first, left before right.
+"""
+def solve_board(coins, max_take=MAX_TAKE):
+    board = tuple(coins)
+    n, k = len(board), check_max_take(max_take)
+    P = prefix_sums(board)
+    values = [array('q', [0]) for _ in range(n + 1)]   # values[i][j - i] = V(i, j)
+    moves = [array('i', [0]) for _ in range(n + 1)]    # +t: take t from the left, -t: from the right
+    right = [deque() for _ in range(n + 1)]            # per i: (m, -P[m] - V(i, m)), m in [j-k, j)
+
+    for j in range(1, n + 1):
+        left = deque()                                 # (m, P[m] - V(m, j)), m in (i, i+k]
+        for i in range(j - 1, -1, -1):
+            g = P[i + 1] - values[i + 1][j - i - 1]
+            while left and left[-1][1] <= g:
+                left.pop()
+            left.append((i + 1, g))
+            if left[0][0] > i + k:
+                left.popleft()
+
+            dq = right[i]
+            f = -P[j - 1] - values[i][j - 1 - i]
+            while dq and dq[-1][1] <= f:
+                dq.pop()
+            dq.append((j - 1, f))
+            if dq[0][0] < j - k:
+                dq.popleft()
+
+            lm, lv = left[0]
+            rm, rv = dq[0]
+            lv -= P[i]
+            rv += P[j]
+            if lv >= rv:
+                values[i].append(lv)
+                moves[i].append(lm - i)
+            else:
+                values[i].append(rv)
+                moves[i].append(rm - j)
+    return SolvedBoard(board, k, values, moves)
+
+
+class SolvedBoard:
+    def __init__(self, board, max_take, values, moves):
+        self.board = board
+        self.max_take = max_take
+        self.values = values
+        self.moves = moves
+        # Number of solved windows board[lo:hi], lo <= hi; about 12 bytes each.
+        self.windows = (len(board) + 1) * (len(board) + 2) // 2
+
+    def value(self, lo, hi):
+        # Best margin for the player to move on board[lo:hi].
+        return self.values[lo][hi - lo]
+
+    def best_action(self, lo, hi):
+        if lo == hi:
+            return None
+        t = self.moves[lo][hi - lo]
+        return ('L', t) if t > 0 else ('R', -t)
+
+
 """
 Returns the best achivable value and the optimal action for the current player.
 
-The move returned should be the optimal action (i, j) that is one of the allowable 
+The value is the final aiScore - pScore under optimal play from both sides (the AI
+maximizes it, the player minimizes it). The move returned is one of the allowable
 actions given a line of coins.
 
 If multiple moves are equally optimal, any of those moves is acceptable.
 
-If the board is a terminal board, the minimax function should return None.
-"""
-
-#Using memoization here for efficiency and avoiding unnecessary calculation
-memo = {}
-def minimax(state, is_maximizing):
-    state_key = (tuple(state.coins), state.turn)
+If the board is a terminal board, the minimax function should return None as the action.
 
-    if state_key in memo:
-        return memo[state_key]
+If an OpeningBook is given it is consulted first; boards solved here are written back
+to it (every window; only boards of at most book.MAX_COINS coins are kept), so a board
+seen in an earlier session is a single lookup.
+"""
 
+# Solved boards, keyed by (board, max_take): every later move of a game is a lookup.
+# A board of n coins holds (n+1)(n+2)/2 windows at ~12 bytes each (~10 KB at 40 coins,
+# ~24 MB at 2,000), so the memo is bounded by total windows, not boards: least recently
+# used boards are dropped once it holds more than MEMO_WINDOWS (~100 MB). The newest
+# board is always kept, however large.
+MEMO_WINDOWS = 8_000_000
+memo = OrderedDict()
+memo_windows = 0
+
+def solved(state, book=None):
+    global memo_windows
+    key = (state.board, state.max_take)
+    table = memo.get(key)
+    if table is not None:
+        memo.move_to_end(key)
+        return table
+    table = memo[key] = solve_board(state.board, state.max_take)
+    memo_windows += table.windows
+    while memo_windows > MEMO_WINDOWS and len(memo) > 1:
+        memo_windows -= memo.popitem(last=False)[1].windows
+    if book is not None:
+        book.add_solved(table)
+    return table
+
+def minimax(state, is_maximizing, book=None):
     if terminal(state):
         return (state.aiScore - state.pScore), None
 
-    possible_actions = actions(state)
-    best_action = None
-
-    if is_maximizing:
-        best_value = -float('inf')
-        for action in possible_actions:
-            value, _ = minimax(succ(state, action), False)
-            if value > best_value:
-                best_value = value
-                best_action = action
+    entry = None
+    if book is not None:
+        entry = book.get(state.board[state.lo:state.hi], state.max_take)
+    if entry is None:
+        table = solved(state, book)
+        action, margin = table.best_action(state.lo, state.hi), table.value(state.lo, state.hi)
     else:
-        best_value = float('inf')
-        for action in possible_actions:
+        action, margin = entry
 
-            value, _ = minimax(succ(state, action), True)
-            if value < best_value:
-                best_value = value
-                best_action = action
+    value = state.aiScore - state.pScore + (margin if is_maximizing else -margin)
+    return value, action
 
-    memo[state_key] = (best_value, best_action)
-    return best_value, best_action
 
-    
\ No newline at end of file
+"""
+Reviews a finished (or partial) game in one pass.
+
+`moves` are the actions played in order, starting with 'player'. The board is solved
+once (or taken from memo if it was played against the AI; a board solved here is not
+added to memo), after which every move is scored with O(1) table lookups:
+    best_action / best_value   the optimal move and the margin it guarantees the mover
+    value                      the margin guaranteed by the move actually played
+    regret                     best_value - value (0 for an optimal move)
+
+Returns a dictionary with the per-move review, the principal variation (optimal line
+from the initial board), the optimal margin for 'player' from the initial board and the
+actual final margin (pScore - aiScore).
+"""
+def analyze_game(initial_coins, moves, max_take=MAX_TAKE):
+    state = State(initial_coins, max_take=max_take)
+    # Reviews must not evict live games' boards from the AI memo (nor fill it with
+    # long finished games), so a board not already there is solved and dropped.
+    table = memo.get((state.board, state.max_take)) or solve_board(state.board, state.max_take)
+    P = state.prefix
+    lo, hi = 0, len(state.board)
+    turn = 'player'
+    margin = 0  # pScore - aiScore so far
+    review = []
+
+    for ply, action in enumerate(moves):
+        if not is_valid_action(action, max_take, hi - lo):
+            raise ValueError(f"Invalid action: {action} at move {ply}")
+        side, t = action
+        if side == 'L':
+            gain, nlo, nhi = P[lo + t] - P[lo], lo + t, hi
+        else:
+            gain, nlo, nhi = P[hi] - P[hi - t], lo, hi - t
+        best_value = table.value(lo, hi)
+        value = gain - table.value(nlo, nhi)
+        review.append(dict(ply=ply, player=turn, action=(side, t),
+                           best_action=table.best_action(lo, hi),
+                           value=value, best_value=best_value, regret=best_value - value))
+        margin += gain if turn == 'player' else -gain
+        lo, hi = nlo, nhi
+        turn = 'ai' if turn == 'player' else 'player'
+
+    pv = []
+    a, b = 0, len(state.board)
+    while a < b:
+        side, t = table.best_action(a, b)
+        pv.append((side, t))
+        a, b = (a + t, b) if side == 'L' else (a, b - t)
+
+    return dict(moves=review, principal_variation=pv,
+                optimal_margin=table.value(0, len(state.board)), actual_margin=margin)
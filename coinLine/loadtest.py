@@ -0,0 +1,91 @@
+# loadtest.py
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from server import GameServer, percentile
+
+"""
+Load-test client for server.py.
+
+Opens `clients` connections that each play `games` full games (random player moves,
+AI moves solved by the server) and reports the sustained moves/sec and the p50/p99
+latency of every request type. Without --port an in-process server is started on a
+free port.
+"""
+
+async def play(host, port, games, coins, k, rng, latencies):
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+
+    async def call(req):
+        start = time.perf_counter()
+        writer.write((json.dumps(req) + "\n").encode())
+        await writer.drain()
+        res = json.loads(await reader.readline())
+        latencies.setdefault(req["op"], []).append(time.perf_counter() - start)
+        if "error" in res:
+            raise RuntimeError(res["error"])
+        return res
+
+    moves = 0
+    for _ in range(games):
+        state = await call(dict(op="new", n=coins, k=k))
+        sid = state["session"]
+        while not state["over"]:
+            if state["turn"] == "player":
+                take = rng.randint(1, min(k, len(state["coins"])))
+                state = await call(dict(op="move", session=sid, action=[rng.choice("LR"), take]))
+            else:
+                state = await call(dict(op="ai", session=sid))
+            moves += 1
+        await call(dict(op="close", session=sid))
+    writer.close()
+    await writer.wait_closed()
+    return moves
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load-test the coinline game server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="connect to a running server (default: start one)")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--games", type=int, default=5, help="games per client")
+    parser.add_argument("--coins", type=int, default=40)
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=2, help="solver processes of the local server")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = tcp = None
+    port = args.port
+    if port is None:
+        server = GameServer(args.workers)
+        await server.start()
+        tcp = await server.serve_tcp(args.host, 0)
+        port = tcp.sockets[0].getsockname()[1]
+
+    latencies = {}
+    start = time.perf_counter()
+    moves = await asyncio.gather(*(play(args.host, port, args.games, args.coins, args.k,
+                                        random.Random(args.seed + i), latencies)
+                                   for i in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.clients} clients x {args.games} games, {sum(moves)} moves in {elapsed:.2f}s")
+    print(f"Sustained: {sum(moves) / elapsed:.0f} moves/sec")
+    print("| Op | Requests | p50 (ms) | p99 (ms) |")
+    print("|----|----------|----------|----------|")
+    for op, lat in sorted(latencies.items()):
+        lat.sort()
+        print(f"| {op} | {len(lat)} | {percentile(lat, 50) * 1000:.2f} | {percentile(lat, 99) * 1000:.2f} |")
+
+    if server is not None:
+        tcp.close()
+        await tcp.wait_closed()
+        await server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
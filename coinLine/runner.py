@@ -5,6 +5,8 @@ import sys
 import random
 import time
 import coinline as cl
+from book import OpeningBook
+from records import GameRecordWriter
 
 # Pygame Setup  ----------------
 pygame.init()
@@ -15,6 +17,11 @@ FONT = pygame.font.SysFont("arial", 24)
 BIG_FONT = pygame.font.SysFont("arial", 40)
 CLOCK = pygame.time.Clock()
 
+# Solved boards persist across sessions
+BOOK_PATH = "coinline_book.bin"
+# Finished games are appended here (see records.py)
+RECORDS_PATH = "coinline_games.clg"
+
 # Coin Details ----------------
 NUM_COINS = 40
 GAP = 20
@@ -73,16 +80,9 @@ def draw_game(state, message=""):
 
 def handle_player_action(state, label):
     label = label.upper()
-    if label == "L1":
-        action = ('L', 1)
-    elif label == "L2":
-        action = ('L', 2)
-    elif label == "R1":
-        action = ('R', 1)
-    elif label == "R2":
-        action = ('R', 2)
-    else:
+    if label[:1] not in ("L", "R") or not label[1:].isdigit():
         return state
+    action = (label[0], int(label[1:]))
 
     if action in cl.actions(state):
         return cl.succ(state, action)
@@ -90,8 +90,11 @@ def handle_player_action(state, label):
 
 # --- Main Game Loop ---
 def main():
+    book = OpeningBook(BOOK_PATH)
+    games = GameRecordWriter(RECORDS_PATH)
     initial_coins = [random.randint(1, 15) for _ in range(NUM_COINS)]
     state = cl.State(initial_coins)
+    moves = []
 
     game_over = False
     result_message = ""
@@ -102,6 +105,9 @@ def main():
         if cl.terminal(state) and not game_over:
             win = cl.winner(state)
             game_over = True
+            book.flush_async()
+            games.write(initial_coins, moves, cl.utility(state))
+            games.flush()
             if win.lower() == "player":
                 result_message = "You Win!"
             elif win.lower() == "ai":
@@ -116,6 +122,8 @@ def main():
         # click, _, _ = pygame.mouse.get_pressed()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                book.close()
+                games.close()
                 pygame.quit()
                 sys.exit()
 
@@ -125,12 +133,16 @@ def main():
                 for label, rect in buttons.items():
                     if rect.collidepoint(event.pos):
                         print("action turn: ", label)
-                        state = handle_player_action(state, label)
+                        new_state = handle_player_action(state, label)
+                        if new_state is not state:
+                            moves.append((label[0], int(label[1:])))
+                        state = new_state
 
             # Start new game if game is over and SPACE is pressed
             if game_over and event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                 initial_coins = [random.randint(1, 15) for _ in range(NUM_COINS)]
                 state = cl.State(initial_coins)
+                moves = []
                 game_over = False
                 result_message = ""
 
@@ -139,9 +151,10 @@ def main():
             print("AI turn")
             pygame.time.delay(500)
             time.sleep(0.5)
-            _, action = cl.minimax(state, is_maximizing=True)
+            _, action = cl.minimax(state, is_maximizing=True, book=book)
             if action:
                 state = cl.succ(state, action)
+                moves.append(action)
 
 
 
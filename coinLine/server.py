@@ -0,0 +1,305 @@
+# server.py
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import coinline as cl
+
+"""
+asyncio coinline game server speaking JSON lines over TCP (or stdin/stdout).
+
+One request per line, one response per line; "id" is echoed back when given.
+    {"op": "new", "coins": [...] | "n": 40, "k": 2}   -> {"session": 7, "coins": [...], "turn": "player", ...}
+                                                          (1 <= n, len(coins) <= max_coins; k >= 1)
+    {"op": "move", "session": 7, "action": ["L", 2]}   -> the player's move, returns the new state
+    {"op": "ai", "session": 7}                         -> the AI's move, returns "action" and the new state
+    {"op": "state", "session": 7}
+    {"op": "close", "session": 7}
+    {"op": "stats"}                                    -> request counts, moves/sec, p50/p99 latency per op
+Errors are returned as {"error": "..."}.
+
+A session belongs to the connection that created it: when that connection ends (EOF or
+a dropped socket, "close" or not) its remaining sessions are deleted, so abandoned games
+do not pile up to max_sessions.
+
+Sessions live in the server process. Boards are solved in a bounded process pool:
+requests are queued (at most max_pending; a full queue stops reading from that client,
+which is the backpressure), gathered into batches of up to batch_size (waiting at most
+batch_delay seconds) and at most `workers` batches run at once. Workers keep nothing;
+they return the whole solved board (coinline.SolvedBoard, ~12 bytes per window: ~10 KB at
+40 coins, ~250 KB at 200), which the server keeps in an LRU bounded by max_windows solved
+windows in total (the default 16M is ~200 MB whatever the board sizes).
+So the first AI move of a game costs a solve and every later one is a lookup in the
+server, whichever worker solved it.
+"""
+
+def _solve_batch(requests):
+    # Runs in a pool worker: [(board, k)] -> [SolvedBoard]
+    return [cl.solve_board(board, k) for board, k in requests]
+
+
+class GameServer:
+    def __init__(self, workers=2, batch_size=64, batch_delay=0.002, max_pending=1024,
+                 max_sessions=100_000, max_coins=200, max_windows=16_000_000):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.max_sessions = max_sessions
+        self.max_coins = max_coins
+        self.max_windows = max_windows
+        self.tables = OrderedDict()     # (board, k) -> SolvedBoard, least recently used first
+        self.table_windows = 0          # sum of table.windows over self.tables
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self.latencies = {}
+        self.counts = {}
+        self.moves = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    async def start(self):
+        # Workers must not be forked from this process: they would inherit the client
+        # sockets and keep connections open after they are closed here.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+        self.queue = asyncio.Queue(self.max_pending)
+        self.slots = asyncio.Semaphore(self.workers)
+        self.dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        self.dispatcher.cancel()
+        self.pool.shutdown(cancel_futures=True)
+
+    # ---- AI solver pool ----
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self.slots.acquire()
+            self.batches += 1
+            asyncio.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, _solve_batch, [req for req, _ in batch])
+            for (_, fut), res in zip(batch, results):
+                fut.set_result(res)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            self.slots.release()
+
+    async def solved(self, state):
+        key = (state.board, state.max_take)
+        table = self.tables.get(key)
+        if table is not None:
+            self.tables.move_to_end(key)
+            return table
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, fut))
+        table = await fut
+        if key not in self.tables:
+            self.table_windows += table.windows
+        self.tables[key] = table
+        while self.table_windows > self.max_windows and len(self.tables) > 1:
+            self.table_windows -= self.tables.popitem(last=False)[1].windows
+        return table
+
+    # ---- Protocol ----
+    def _state(self, sid, state):
+        return dict(session=sid, coins=state.coins, pScore=state.pScore, aiScore=state.aiScore,
+                    turn=state.turn, over=cl.terminal(state), winner=cl.winner(state))
+
+    def _coins(self, req):
+        if "coins" in req:
+            coins = req["coins"]
+            if not isinstance(coins, list) or not 1 <= len(coins) <= self.max_coins:
+                raise ValueError(f"coins must be a list of 1 to {self.max_coins} integers")
+            if not all(isinstance(c, int) and not isinstance(c, bool) and abs(c) < 1 << 40 for c in coins):
+                raise ValueError("coins must be integers (|c| < 2^40)")
+            return coins
+        n = req.get("n", 40)
+        if isinstance(n, bool) or not isinstance(n, int) or not 1 <= n <= self.max_coins:
+            raise ValueError(f"n must be an integer from 1 to {self.max_coins}")
+        return [random.randint(1, 15) for _ in range(n)]
+
+    def _session(self, req):
+        state = self.sessions.get(req.get("session"))
+        if state is None:
+            raise ValueError(f"Unknown session: {req.get('session')}")
+        return req["session"], state
+
+    async def handle(self, req, owned):
+        # owned: ids of the sessions created by the requesting connection
+        op = req.get("op")
+        if op == "new":
+            if len(self.sessions) >= self.max_sessions:
+                raise ValueError("Too many sessions")
+            state = cl.State(self._coins(req), max_take=req.get("k", cl.MAX_TAKE))
+            sid = next(self._ids)
+            self.sessions[sid] = state
+            owned.add(sid)
+            return self._state(sid, state)
+        if op == "move":
+            sid, state = self._session(req)
+            if state.turn != 'player':
+                raise ValueError("Not the player's turn")
+            self.sessions[sid] = state = cl.succ(state, tuple(req["action"]))
+            self.moves += 1
+            return self._state(sid, state)
+        if op == "ai":
+            sid, state = self._session(req)
+            if state.turn != 'ai' or cl.terminal(state):
+                raise ValueError("Not the AI's turn")
+            table = await self.solved(state)
+            if self.sessions.get(sid) is not state:
+                raise ValueError(f"Session {sid} was closed or moved while the AI was thinking")
+            action = table.best_action(state.lo, state.hi)
+            self.sessions[sid] = state = cl.succ(state, action)
+            self.moves += 1
+            return dict(self._state(sid, state), action=action)
+        if op == "state":
+            return self._state(*self._session(req))
+        if op == "close":
+            sid, _ = self._session(req)
+            del self.sessions[sid]
+            owned.discard(sid)
+            return dict(session=sid, closed=True)
+        if op == "stats":
+            return self.stats()
+        raise ValueError(f"Unknown op: {op}")
+
+    async def respond(self, line, owned):
+        start = time.perf_counter()
+        op, req = None, {}
+        try:
+            req = json.loads(line)
+            op = req.get("op")
+            res = await self.handle(req, owned)
+        except Exception as e:
+            res = dict(error=str(e))
+        if isinstance(req, dict) and "id" in req:
+            res["id"] = req["id"]
+        if op:
+            self.counts[op] = self.counts.get(op, 0) + 1
+            self.latencies.setdefault(op, deque(maxlen=100_000)).append(time.perf_counter() - start)
+        return json.dumps(res) + "\n"
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started
+        ops = {}
+        for op, lat in self.latencies.items():
+            ordered = sorted(lat)
+            ops[op] = dict(count=self.counts[op], p50=percentile(ordered, 50), p99=percentile(ordered, 99))
+        return dict(sessions=len(self.sessions), moves=self.moves, moves_per_sec=self.moves / elapsed,
+                    batches=self.batches, pending=self.queue.qsize(), tables=len(self.tables), table_windows=self.table_windows, ops=ops)
+
+    # ---- Transports ----
+    async def _readline(self, reader):
+        # Next request line (b"" at EOF), or None for a line longer than the reader's
+        # limit, which is dropped up to its newline.
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+        while True:
+            await reader.readexactly(consumed)
+            try:
+                await reader.readuntil(b"\n")
+                break
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+        return None
+
+    async def _reply(self, line, owned):
+        if line is None:
+            return json.dumps(dict(error="line too long")) + "\n"
+        return await self.respond(line, owned)
+
+    async def client(self, reader, writer):
+        owned = set()
+        try:
+            while (line := await self._readline(reader)) != b"":
+                writer.write((await self._reply(line, owned)).encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for sid in owned:
+                self.sessions.pop(sid, None)
+            writer.close()
+
+    async def serve_tcp(self, host, port):
+        server = await asyncio.start_server(self.client, host, port, limit=1 << 20)
+        return server
+
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=1 << 20)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        owned = set()
+        while (line := await self._readline(reader)) != b"":
+            sys.stdout.write(await self._reply(line, owned))
+            sys.stdout.flush()
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Coinline JSON-lines game server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stdio", action="store_true", help="serve stdin/stdout instead of TCP")
+    parser.add_argument("--workers", type=int, default=2, help="AI solver processes")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-pending", type=int, default=1024)
+    parser.add_argument("--max-coins", type=int, default=200, help="largest board a client may start")
+    parser.add_argument("--max-windows", type=int, default=16_000_000,
+                        help="solved windows kept in memory (~12 bytes each)")
+    args = parser.parse_args()
+
+    server = GameServer(args.workers, args.batch_size, max_pending=args.max_pending,
+                        max_coins=args.max_coins, max_windows=args.max_windows)
+    await server.start()
+    try:
+        if args.stdio:
+            await server.serve_stdio()
+        else:
+            tcp = await server.serve_tcp(args.host, args.port)
+            print(f"Serving on {args.host}:{tcp.sockets[0].getsockname()[1]}", file=sys.stderr)
+            async with tcp:
+                await tcp.serve_forever()
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,224 @@
+# ============================================================
+# Benchmark — random NJugs instances and solver scaling sweep
+# ============================================================
+
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import queue as queue_module
+import random
+import signal
+import sys
+import time
+
+from solvers import *
+from the3jugs import *
+
+SOLVERS = {
+    "backtracking": BacktrackingSearch,
+    "backtrackingIter": BacktrackingSearchIterative,
+    "bfs": BFSSearch,
+    "dfs": DFSSearch,
+    "ids": IterativeDeepeningSearch,
+    "parallelBfs": ParallelBFSSearch,
+}
+
+"""
+Returns ``count`` reproducible NJugs instances for the given ``seed``.
+
+Jug counts are drawn from ``jugs`` (default 2..8) and capacities are drawn so their
+sum is close to a target picked in [n_jugs, max_sum]. Every instance also gets a target
+size, spread geometrically from ``min_states`` to ``max_states`` over the sweep. A BFS
+from the start runs level by level until it has seen that many states (or the reachable
+space is exhausted) and the goal is drawn from the level whose cumulative state count is
+closest to the target (in log scale), so the goal is reachable and as deep as the target
+allows. ``size`` is the number of states within the goal's depth and is what the
+benchmark fits its growth curves against.
+
+returns a list of dictionaries in the format of test_cases.json plus ``size``:
+    {"name": ..., "capacities": [...], "goal": [...], "size": ...}
+"""
+def generate_cases(count, seed=0, jugs=range(2, 9), max_sum=2000, min_states=100,
+                   max_states=50_000):
+    rng = random.Random(seed)
+    jugs = list(jugs)
+    ratio = max_states / min_states
+    cases = []
+    for idx in range(1, count + 1):
+        n = rng.choice(jugs)
+        target = rng.randint(n, max(n, max_sum))
+        # Split ``target`` into n positive parts.
+        cuts = sorted(rng.sample(range(1, target), n - 1)) if target > n else list(range(1, n))
+        caps = [b - a for a, b in zip([0] + cuts, cuts + [target])]
+        want = min_states * ratio ** ((idx - 1) / max(1, count - 1))
+
+        problem = NJugsProblem(capacities=caps, goal=[0] * n)
+        level = [problem.start_state()]
+        seen = set(level)
+        levels = [(level, len(seen))]
+        while len(seen) < want:
+            nxt = []
+            for state in level:
+                for action in problem.actions(state):
+                    child = problem.succ(state, action)
+                    if child not in seen:
+                        seen.add(child)
+                        nxt.append(child)
+            if not nxt:
+                break
+            level = nxt
+            levels.append((level, len(seen)))
+
+        level, size = min(levels[-2:], key=lambda ls: abs(math.log(ls[1] / want)))
+        cases.append(dict(name=f"rand{seed}_{idx}", capacities=caps,
+                          goal=list(rng.choice(level)), size=size))
+    return cases
+
+def _run_solver(name, capacities, goal, queue):
+    # Turn terminate() into SystemExit so solvers run their cleanup (worker processes,
+    # shared memory) before the child exits.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(1))
+    problem = NJugsProblem(capacities=capacities, goal=goal)
+    start = time.perf_counter()
+    try:
+        res = SOLVERS[name](problem).solve()
+    except Exception as e:
+        res = dict(best_cost=math.nan, found=False, expanded=0, error=type(e).__name__)
+    res["time"] = time.perf_counter() - start
+    res.pop("best_path", None)
+    queue.put(res)
+
+"""
+Runs one solver on one case in a child process and stops it after ``timeout`` seconds.
+
+returns the solver's dictionary (without best_path) plus ``time``, with ``error`` set to
+the exception name if the solver raised, or dict(timeout=True) when the limit was hit.
+"""
+def run_with_timeout(name, case, timeout):
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_run_solver,
+                                   args=(name, case["capacities"], case["goal"], queue))
+    proc.start()
+    try:
+        res = queue.get(timeout=timeout)
+    except queue_module.Empty:
+        res = dict(timeout=True, time=timeout) if proc.is_alive() else \
+            dict(error=f"exit code {proc.exitcode}", time=timeout)
+    proc.join(1)
+    if proc.is_alive():
+        proc.terminate()
+        proc.join(5)
+    if proc.is_alive():
+        proc.kill()
+        proc.join()
+    return res
+
+"""
+Least-squares fit of y = a * x^k on the points with x, y > 0 (a line in log-log space).
+
+returns (a, k) or None when fewer than two usable points are given.
+"""
+def fit_power_law(points):
+    pts = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    if len(pts) < 2:
+        return None
+    mx = sum(x for x, _ in pts) / len(pts)
+    my = sum(y for _, y in pts) / len(pts)
+    sxx = sum((x - mx) ** 2 for x, _ in pts)
+    if sxx == 0:
+        return None
+    k = sum((x - mx) * (y - my) for x, y in pts) / sxx
+    return math.exp(my - k * mx), k
+
+"""
+Fits time and expansions against instance size (states within the goal's depth,
+see generate_cases) for every solver.
+
+For each solver the report gives the fitted curves, the largest instance solved
+within the timeout and the size at which the fitted time reaches the timeout, i.e.
+where the algorithm stops being usable.
+"""
+def summarize(rows, timeout):
+    summary = {}
+    for name in SOLVERS:
+        done = [r for r in rows if r["solver"] == name and not r["timeout"] and not r["error"]]
+        time_fit = fit_power_law([(r["size"], r["time"]) for r in done])
+        exp_fit = fit_power_law([(r["size"], r["expanded"]) for r in done])
+        limit = None
+        if time_fit and time_fit[1] > 0:
+            a, k = time_fit
+            limit = (timeout / a) ** (1 / k)
+        summary[name] = dict(
+            runs=sum(r["solver"] == name for r in rows),
+            timeouts=sum(r["solver"] == name and r["timeout"] for r in rows),
+            errors=sum(r["solver"] == name and bool(r["error"]) for r in rows),
+            largest_solved=max((r["size"] for r in done), default=0),
+            time_fit=dict(a=time_fit[0], k=time_fit[1]) if time_fit else None,
+            expanded_fit=dict(a=exp_fit[0], k=exp_fit[1]) if exp_fit else None,
+            usable_up_to=limit,
+        )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep every solver over random NJugs instances.")
+    parser.add_argument("--count", type=int, default=40, help="number of instances")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-jugs", type=int, default=2)
+    parser.add_argument("--max-jugs", type=int, default=8)
+    parser.add_argument("--max-sum", type=int, default=2000, help="largest capacity sum")
+    parser.add_argument("--min-states", type=int, default=100,
+                        help="target size (states within the goal's depth) of the smallest instance")
+    parser.add_argument("--max-states", type=int, default=50_000,
+                        help="target size of the largest instance")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--solvers", nargs="+", default=list(SOLVERS), choices=list(SOLVERS))
+    parser.add_argument("--csv", default="benchmark.csv")
+    parser.add_argument("--json", default="benchmark.json")
+    args = parser.parse_args()
+
+    if not 0 < args.min_states <= args.max_states:
+        parser.error("--min-states must be positive and at most --max-states")
+    cases = generate_cases(args.count, args.seed, range(args.min_jugs, args.max_jugs + 1),
+                           args.max_sum, args.min_states, args.max_states)
+    cases.sort(key=lambda c: c["size"])
+
+    rows = []
+    for case in cases:
+        for name in args.solvers:
+            res = run_with_timeout(name, case, args.timeout)
+            row = dict(
+                case=case["name"], jugs=len(case["capacities"]),
+                capacity_sum=sum(case["capacities"]), size=case["size"], solver=name,
+                timeout=res.get("timeout", False), error=res.get("error"), time=res["time"],
+                found=res.get("found"), expanded=res.get("expanded"),
+                solution_depth=res.get("solution_depth"),
+            )
+            rows.append(row)
+            status = "TIMEOUT" if row["timeout"] else row["error"] or ("FOUND" if row["found"] else "NO SOLUTION")
+            print(f"{case['name']:<12} n={row['jugs']} sum={row['capacity_sum']:<5} "
+                  f"[{name.upper():<16}] {status:<14} | time={row['time']:.5f}s | expanded={row['expanded']}")
+
+    with open(args.csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["case"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+    summary = summarize([r for r in rows if r["solver"] in args.solvers], args.timeout)
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(dict(seed=args.seed, timeout=args.timeout, cases=cases, runs=rows, summary=summary), f, indent=2)
+    print(f"\nWrote {args.csv} and {args.json}")
+
+    print("\n| Solver | Timeouts | Errors | Largest solved | time ~ size^k | expanded ~ size^k | Usable up to size |")
+    print("|--------|----------|--------|----------------|---------------|-------------------|-------------------|")
+    for name in args.solvers:
+        s = summary[name]
+        tk = f"{s['time_fit']['k']:.2f}" if s["time_fit"] else "N/A"
+        ek = f"{s['expanded_fit']['k']:.2f}" if s["expanded_fit"] else "N/A"
+        lim = f"{s['usable_up_to']:.3g}" if s["usable_up_to"] else "N/A"
+        print(f"| {name} | {s['timeouts']}/{s['runs']} | {s['errors']}/{s['runs']} | {s['largest_solved']} | {tk} | {ek} | {lim} |")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# ============================================================
+# Instrumentation — search hooks and per-phase profiling
+# ============================================================
+
+import json
+import time
+import tracemalloc
+
+"""
+Base class of the search hooks. Every callback is a no-op; collectors override the
+ones they need and are passed to a solver with ``hooks=``.
+
+    on_expand(state, depth, frontier)    a non-goal state is expanded (actions() is about
+                                         to be called), in every solver
+    on_generate(state, action, child)    succ() produced a successor
+    on_duplicate(state)                  a state was already in the explored set
+    on_goal_test(state, is_goal)         is_end() was evaluated
+    on_phase(phase, start, elapsed)      time spent in "actions", "succ", "goal_test" or "dedupe"
+                                         ("expand"/"claim" per level for ParallelBFSSearch)
+
+``frontier`` is the solver's open list at that moment, which is solver-specific: the queue
+or stack length for BFSSearch, DFSSearch and BacktrackingSearchIterative, and the current
+path length (the open recursion/DFS stack) for BacktrackingSearch and
+IterativeDeepeningSearch.
+
+Solvers built without hooks use the plain problem and a plain set, so turning
+instrumentation off costs nothing but one ``is not None`` test per expansion.
+"""
+
+class SearchHooks:
+    def on_expand(self, state, depth, frontier):
+        pass
+
+    def on_generate(self, state, action, child):
+        pass
+
+    def on_duplicate(self, state):
+        pass
+
+    def on_goal_test(self, state, is_goal):
+        pass
+
+    def on_phase(self, phase, start, elapsed):
+        pass
+
+
+class InstrumentedProblem:
+    # Wraps a SearchProblem, timing actions/succ/is_end and reporting them to the hooks.
+    def __init__(self, problem, hooks):
+        self.problem = problem
+        self.hooks = hooks
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+    def start_state(self):
+        return self.problem.start_state()
+
+    def cost(self, state, action):
+        return self.problem.cost(state, action)
+
+    def actions(self, state):
+        start = time.perf_counter()
+        actions = self.problem.actions(state)
+        self.hooks.on_phase("actions", start, time.perf_counter() - start)
+        return actions
+
+    def succ(self, state, action):
+        start = time.perf_counter()
+        child = self.problem.succ(state, action)
+        self.hooks.on_phase("succ", start, time.perf_counter() - start)
+        self.hooks.on_generate(state, action, child)
+        return child
+
+    def is_end(self, state):
+        start = time.perf_counter()
+        is_goal = self.problem.is_end(state)
+        self.hooks.on_phase("goal_test", start, time.perf_counter() - start)
+        self.hooks.on_goal_test(state, is_goal)
+        return is_goal
+
+
+class VisitedSet(set):
+    # Explored set that times membership tests/insertions and reports duplicate hits.
+    def __init__(self, hooks):
+        super().__init__()
+        self.hooks = hooks
+
+    def __contains__(self, key):
+        start = time.perf_counter()
+        found = set.__contains__(self, key)
+        self.hooks.on_phase("dedupe", start, time.perf_counter() - start)
+        if found:
+            self.hooks.on_duplicate(key)
+        return found
+
+    def add(self, key):
+        start = time.perf_counter()
+        set.add(self, key)
+        self.hooks.on_phase("dedupe", start, time.perf_counter() - start)
+
+
+def instrumented(problem, hooks):
+    return problem if hooks is None else InstrumentedProblem(problem, hooks)
+
+def visited_set(hooks):
+    return set() if hooks is None else VisitedSet(hooks)
+
+
+"""
+Built-in collector: per-phase time and call counts, event counters, frontier size
+over time and (optionally) traced memory.
+
+    profiler = PhaseProfiler(sample_every=100, sample_memory=True)
+    res = BFSSearch(problem, hooks=profiler).solve()
+    profiler.stop()
+    profiler.to_json("profile.json")
+    profiler.to_speedscope("profile.speedscope.json")   # open in https://www.speedscope.app
+
+A sample (time, expansions, depth, frontier size, memory) is taken every ``sample_every``
+expansions. The speedscope trace keeps at most ``max_events`` phase events.
+"""
+
+class PhaseProfiler(SearchHooks):
+    def __init__(self, sample_every=100, sample_memory=False, max_events=1_000_000):
+        self.sample_every = sample_every
+        self.sample_memory = sample_memory
+        self.max_events = max_events
+        self.phase_time = {}
+        self.phase_calls = {}
+        self.counts = dict(expand=0, generate=0, duplicate=0, goal_test=0, goal_hit=0)
+        self.samples = []
+        self.events = []
+        self._started_tracemalloc = False
+        self.start()
+
+    def start(self):
+        self.t0 = time.perf_counter()
+        self.t1 = None
+        if self.sample_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self):
+        self.t1 = time.perf_counter()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    # ---- SearchHooks ----
+    def on_expand(self, state, depth, frontier):
+        self.counts["expand"] += 1
+        if self.counts["expand"] % self.sample_every == 1 or self.sample_every == 1:
+            memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+            self.samples.append(dict(t=time.perf_counter() - self.t0, expanded=self.counts["expand"],
+                                     depth=depth, frontier=frontier, memory=memory))
+
+    def on_generate(self, state, action, child):
+        self.counts["generate"] += 1
+
+    def on_duplicate(self, state):
+        self.counts["duplicate"] += 1
+
+    def on_goal_test(self, state, is_goal):
+        self.counts["goal_test"] += 1
+        self.counts["goal_hit"] += bool(is_goal)
+
+    def on_phase(self, phase, start, elapsed):
+        self.phase_time[phase] = self.phase_time.get(phase, 0.0) + elapsed
+        self.phase_calls[phase] = self.phase_calls.get(phase, 0) + 1
+        if len(self.events) < self.max_events:
+            self.events.append((phase, start, elapsed))
+
+    # ---- Export ----
+    def report(self):
+        end = self.t1 if self.t1 is not None else time.perf_counter()
+        return dict(
+            total_time=end - self.t0,
+            phases={p: dict(time=t, calls=self.phase_calls[p]) for p, t in self.phase_time.items()},
+            counts=dict(self.counts),
+            samples=self.samples,
+            peak_memory=max((s["memory"] for s in self.samples if s["memory"] is not None), default=None),
+        )
+
+    def to_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def to_speedscope(self, path, name="search"):
+        end = (self.t1 if self.t1 is not None else time.perf_counter()) - self.t0
+        phases = sorted({p for p, _, _ in self.events})
+        frames = ["solve"] + phases
+        index = {p: i for i, p in enumerate(frames)}
+        events = [dict(type="O", frame=0, at=0.0)]
+        for phase, start, elapsed in self.events:
+            at = start - self.t0
+            events.append(dict(type="O", frame=index[phase], at=at))
+            events.append(dict(type="C", frame=index[phase], at=at + elapsed))
+        events.append(dict(type="C", frame=0, at=max(end, events[-1]["at"])))
+        trace = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [dict(name=f) for f in frames]},
+            "profiles": [dict(type="evented", name=name, unit="seconds",
+                              startValue=0.0, endValue=events[-1]["at"], events=events)],
+            "name": name,
+            "exporter": "nJugsProblem.instrumentation",
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
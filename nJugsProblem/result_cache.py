@@ -0,0 +1,99 @@
+# ============================================================
+# Result cache — content-addressed solver results in sqlite
+# ============================================================
+
+import hashlib
+import inspect
+import json
+import sqlite3
+import time
+
+"""
+On-disk cache of solver results so unchanged (case, algorithm) pairs are not recomputed.
+
+A result is keyed on (capacities, goal, solver name, hash of the source of every module
+the run depends on). ``sources`` lists classes or modules; a class stands for the whole
+module defining it, so a change to a helper it calls (instrumentation, goal classes,
+SearchProblem) invalidates its results too. Everything lives in a single sqlite file.
+
+Results returned by get() carry ``cached=True``; their ``time`` is the one measured
+when the result was first computed.
+
+    cache = ResultCache("results_cache.sqlite")
+    sources = (BFSSearch, NJugsProblem, instrumentation)
+    res = cache.get(caps, goal, "bfs", sources)
+    if res is None:
+        res = BFSSearch(problem).solve()
+        cache.put(caps, goal, "bfs", sources, res)
+    print(cache.stats())
+"""
+
+class ResultCache:
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._source_hashes = {}
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, solver TEXT, source_hash TEXT,"
+            " capacities TEXT, goal TEXT, result TEXT, created REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_solver ON results (solver, source_hash)")
+        self.db.commit()
+
+    def source_hash(self, *objects):
+        # Hash of the source of the modules defining the given classes (or the modules given).
+        modules = sorted({o if inspect.ismodule(o) else inspect.getmodule(o) for o in objects},
+                         key=lambda m: m.__name__)
+        names = tuple(m.__name__ for m in modules)
+        if names not in self._source_hashes:
+            h = hashlib.sha256()
+            for m in modules:
+                h.update(inspect.getsource(m).encode("utf-8"))
+            self._source_hashes[names] = h.hexdigest()
+        return self._source_hashes[names]
+
+    def key(self, capacities, goal, solver_name, source_hash):
+        caps = [int(c) for c in capacities]
+        if isinstance(goal, (set, frozenset)):
+            goal = sorted([int(x) for x in g] for g in goal)
+        elif isinstance(goal, (list, tuple)):
+            goal = [int(g) for g in goal]
+        else:
+            goal = repr(goal)
+        blob = json.dumps([caps, goal, solver_name, source_hash])
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, capacities, goal, solver_name, sources):
+        key = self.key(capacities, goal, solver_name, self.source_hash(*sources))
+        row = self.db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        res = json.loads(row[0])
+        res["cached"] = True
+        return res
+
+    def put(self, capacities, goal, solver_name, sources, result):
+        source_hash = self.source_hash(*sources)
+        self.db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.key(capacities, goal, solver_name, source_hash), solver_name, source_hash,
+             json.dumps([int(c) for c in capacities]), json.dumps(goal, default=repr),
+             json.dumps({k: v for k, v in result.items() if k != "cached"}), time.time()),
+        )
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0
+        return f"cache: {self.hits} hits, {self.misses} misses ({rate:.0%} hit rate) [{self.path}]"
@@ -3,12 +3,15 @@
 # Authors: S. El Alaoui and Gemini
 # ============================================================
 
+import argparse
 import math
 import json
 import time  # <--- Added for tracking execution time
 
 from solvers import *
 from the3jugs import * 
+from result_cache import ResultCache
+import instrumentation
 
 """
 Runs all four algorithms on a test case 
@@ -18,8 +21,12 @@ and returns the results as a dictionary.
         execution time
     for each algorithm and add it to their respective 
     dictionaries (bt_res, bti_res, bfs_res and dfs_res)
+
+If a ResultCache is given, results for unchanged (case, algorithm) pairs are
+read from it (marked cached=True) and new ones are written back. A result is
+reused only while solvers.py, the3jugs.py and instrumentation.py are unchanged.
 """
-def run_case(case):
+def run_case(case, cache=None):
     capacities = case["capacities"]
     goal = case["goal"]
 
@@ -36,8 +43,16 @@ def run_case(case):
     results_data = {}
 
     for name, search_class in algs.items():
+        sources = (search_class, NJugsProblem, instrumentation)
+        if cache is not None:
+            res = cache.get(capacities, goal, name, sources)
+            if res is not None:
+                results_data[name] = res
+                continue
+
         # --- Start Timer ---
         start_time = time.time()
+        failed = False
         
         try:
             if name == "backtracking":
@@ -47,22 +62,26 @@ def run_case(case):
                 except RecursionError:
                     # Keep existing Part 1 crash handling
                     res = dict(best_cost=math.nan, best_path=[], found=False, expanded=0)
+                    failed = True
             else:
                 solver = search_class(problem)
                 res = solver.solve()
         except Exception as e:
             print(f"Error in {name}: {e}")
             res = dict(best_cost=math.nan, best_path=[], found=False, expanded=0)
+            failed = True
             
         # --- Stop Timer & Store ---
         res["time"] = time.time() - start_time
         results_data[name] = res
+        if cache is not None and not failed:
+            cache.put(capacities, goal, name, sources, res)
 
     return {
         "name": case.get("name", ""),
         "capacities": capacities,
         "start": [0, 0, 0],
-        "goal": goal,
+        "goal": goal if isinstance(goal, (list, tuple)) else repr(problem.goal),
         "backtracking": results_data["backtracking"],
         "backtrackingIter": results_data["backtrackingIter"],
         "bfs": results_data["bfs"],
@@ -85,14 +104,15 @@ def pretty_print_result(res, show_paths=False):
     print(f"Case: {res['name']}")
     print(f" Capacities: {res['capacities']}")
     print(f" Start:      {tuple(res['start'])}")
-    print(f" Goal:       {tuple(res['goal'])}")
+    goal = res['goal']
+    print(f" Goal:       {tuple(goal) if isinstance(goal, (list, tuple)) else goal}")
 
     for alg in ["backtracking", "backtrackingIter", "bfs", "dfs"]:
         r = res[alg]
         status = "FOUND" if r.get("found") else "NO SOLUTION"
         
         # --- Part 3 Metric Extraction ---
-        exec_time = f"{r.get('time', 0):.5f}s"
+        exec_time = f"{r.get('time', 0):.5f}s" + (" (cached)" if r.get("cached") else "")
         b = f"{r.get('avg_branching', 0):.2f}"
         d = r.get("solution_depth", "N/A")
         D = r.get("max_depth", "N/A")
@@ -147,14 +167,26 @@ def print_terminal_graph(results):
         print(f"Sum {total_sum:3}: {bar} ({d})")
 
 def main():
+    parser = argparse.ArgumentParser(description="Run all solvers on test_cases.json.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="recompute every case instead of reusing results_cache.sqlite")
+    args = parser.parse_args()
+
     tc_file = "test_cases.json"
     cases = read_cases_from_json(tc_file)
+    cache = None if args.no_cache else ResultCache("results_cache.sqlite")
     
     results = []
     for case in cases:
-        res = run_case(case)
+        res = run_case(case, cache)
         results.append(res)
         pretty_print_result(res)
+        if cache is not None:
+            cache.commit()
+
+    if cache is not None:
+        print("\n" + cache.stats())
+        cache.close()
 
     with open("results.json", "w", encoding="utf-8") as f:
         json.dump(results, f, indent=2)
@@ -168,7 +200,8 @@ def main():
         D = res['dfs'].get('max_depth', 0)
         b = res['bfs'].get('avg_branching', 0)
         t = res['bfs'].get('time', 0)
-        print(f"| {res['name']} | {s} | {d} | {D} | {b:.2f} | {t:.5f}s |")
+        cached = " (cached)" if res['bfs'].get('cached') else ""
+        print(f"| {res['name']} | {s} | {d} | {D} | {b:.2f} | {t:.5f}s{cached} |")
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,22 @@
 # ============================================================
-# Solvers — Backtracking, BFS, and DFS
+# Solvers — Backtracking, BFS, DFS and Iterative Deepening
 # Authors: S. El Alaoui and Gemini
 # ============================================================
 
 import math
+import heapq
+from array import array
 from collections import deque
+from multiprocessing import Pipe, Process, shared_memory
+import os
 import time
 
+from instrumentation import instrumented, visited_set
+
+# Every solver accepts hooks= (see instrumentation.py) to observe expansions, generated
+# states, duplicate hits and goal tests. ParallelBFSSearch is the exception: its workers
+# call no hooks, and it only reports each level's expand and claim phase times via on_phase.
+
 # Ensure SearchProblem is available from your problem file
 # from the3jugs import SearchProblem 
 
@@ -20,15 +30,19 @@ returns a dictionary with the following informatin:
     best_path= [s_0, ..., s*],
     found= boolean : path found or not 
     expanded= # of state explored 
-        
+
+With first_solution=True the search stops at the first state satisfying the goal
+instead of looking for a cheaper path (useful with predicate or set goals).
 """
 
 class BacktrackingSearch:
-    def __init__(self, problem):
+    def __init__(self, problem, first_solution=False, hooks=None):
         self.best_cost = math.inf
         self.best_path = None
-        self.explored = set()
-        self.problem = problem
+        self.explored = visited_set(hooks)
+        self.problem = instrumented(problem, hooks)
+        self.first_solution = first_solution
+        self.hooks = hooks
 
     def recurse(self, state, path, cost: int):
         if self.problem.is_end(state):
@@ -37,7 +51,11 @@ class BacktrackingSearch:
                 self.best_path = path[:]
             return
 
+        if self.hooks is not None:
+            self.hooks.on_expand(state, len(path), len(path))
         for action in self.problem.actions(state):
+            if self.first_solution and self.best_path is not None:
+                return
             next_state = self.problem.succ(state, action)
             key = str(next_state)
             if key not in self.explored:
@@ -66,14 +84,17 @@ returns a dictionary with the following informatin:
     found= boolean : path found or not 
     expanded= # of state explored
 
+With first_solution=True the search stops at the first state satisfying the goal.
 """
 
 class BacktrackingSearchIterative:
-    def __init__(self, problem):
+    def __init__(self, problem, first_solution=False, hooks=None):
         self.best_cost = math.inf
         self.best_path = None
-        self.explored = set()
-        self.problem = problem
+        self.explored = visited_set(hooks)
+        self.problem = instrumented(problem, hooks)
+        self.first_solution = first_solution
+        self.hooks = hooks
 
     def solve(self):
         start = self.problem.start_state()
@@ -87,7 +108,11 @@ class BacktrackingSearchIterative:
                 if cost < self.best_cost:
                     self.best_cost = cost
                     self.best_path = path[:]
+                if self.first_solution:
+                    break
                 continue
+            if self.hooks is not None:
+                self.hooks.on_expand(state, len(path), len(stack))
 
             for action in reversed(list(self.problem.actions(state))):
                 next_state = self.problem.succ(state, action)
@@ -114,20 +139,21 @@ returns a dictionary with the following informatin:
 """
 
 class BFSSearch:
-    def __init__(self, problem):
-        self.problem = problem
+    def __init__(self, problem, hooks=None):
+        self.problem = instrumented(problem, hooks)
+        self.hooks = hooks
 
     def solve(self):
         start = self.problem.start_state()
         queue = deque([(start, [], 0)])
-        explored = {str(start)}
+        explored = visited_set(self.hooks)
+        explored.add(str(start))
         total_actions = 0
         max_depth = 0
 
         while queue:
             state, path, cost = queue.popleft()
             if cost > max_depth: max_depth = cost
-
             if self.problem.is_end(state):
                 avg_b = total_actions / len(explored) if explored else 0
                 return dict(
@@ -140,6 +166,8 @@ class BFSSearch:
                     avg_branching=avg_b       # b
                 )
 
+            if self.hooks is not None:
+                self.hooks.on_expand(state, cost, len(queue))
             actions = self.problem.actions(state)
             total_actions += len(actions)
             for action in actions:
@@ -162,20 +190,21 @@ returns a dictionary with the following informatin:
 """
 
 class DFSSearch:
-    def __init__(self, problem):
-        self.problem = problem
+    def __init__(self, problem, hooks=None):
+        self.problem = instrumented(problem, hooks)
+        self.hooks = hooks
 
     def solve(self):
         start = self.problem.start_state()
         stack = [(start, [], 0)]
-        explored = {str(start)}
+        explored = visited_set(self.hooks)
+        explored.add(str(start))
         total_actions = 0
         max_depth = 0
 
         while stack:
             state, path, cost = stack.pop()
             if cost > max_depth: max_depth = cost
-
             if self.problem.is_end(state):
                 avg_b = total_actions / len(explored) if explored else 0
                 return dict(
@@ -188,6 +217,8 @@ class DFSSearch:
                     avg_branching=avg_b
                 )
 
+            if self.hooks is not None:
+                self.hooks.on_expand(state, cost, len(stack))
             actions = self.problem.actions(state)
             total_actions += len(actions)
             for action in reversed(list(actions)):
@@ -198,3 +229,391 @@ class DFSSearch:
         return dict(best_cost=math.inf, found=False, expanded=len(explored))
 
 
+"""
+Iterative-deepening DFS with a bounded, depth-aware transposition cache.
+The start state is tested first, then depth-limited DFS runs with limits 1, 2, 3, ...
+so, like BFS, the first goal found is at minimum depth, while memory stays proportional
+to the depth plus the cache budget.
+
+The cache maps a state to the shallowest depth it was reached at during the current
+iteration; a state reached again at an equal or deeper depth is skipped since its subtree
+was already searched with at least as much remaining depth. States at the limit itself are
+never cached (they are not expanded). When the cache holds cache_size states, an entry of
+the deepest depth present is dropped first, since shallow entries prune the most.
+
+Termination: while nothing is evicted, the cache holds exactly the states closer than the
+limit, so an iteration that caches no more states than the previous one proves that no
+state is left beyond it. Once the cache overflows that proof is lost and the search stops
+at max_limit instead (default: an upper bound on the number of reachable NJugs states).
+A problem without capacities has no default bound: if the cache overflows and max_limit
+was not given, solve() raises ValueError rather than searching forever.
+A cache smaller than the states within the solution depth only prunes part of the
+tree, so expansions grow quickly (e.g. 20 entries vs 1000 is ~100x more expansions),
+and proving an instance unsolvable then takes exponential time.
+
+returns a dictionary with the following informatin: 
+    best_cost= path cost (i.e. number of steps from start to the goal),
+    best_path= [s_0, ..., s*],
+    found= boolean : path found or not 
+    expanded= # of expansions over all iterations
+    solution_depth, max_depth, avg_branching as for BFSSearch
+"""
+
+class IterativeDeepeningSearch:
+    def __init__(self, problem, cache_size=100_000, max_limit=None, hooks=None):
+        self.problem = instrumented(problem, hooks)
+        self.cache_size = cache_size
+        self.hooks = hooks
+        if max_limit is None and hasattr(problem, "capacities"):
+            # Every reachable state has a jug that is empty or full.
+            caps = problem.capacities
+            max_limit = math.prod(c + 1 for c in caps) - math.prod(c - 1 for c in caps)
+        self.max_limit = max_limit
+
+    def solve(self):
+        start = self.problem.start_state()
+        self.expanded = 0
+        self.total_actions = 0
+        self.max_depth = 0
+
+        if self.problem.is_end(start):
+            return self._result([start])
+
+        limit, cached = 1, 0
+        while self.max_limit is None or limit <= self.max_limit:
+            path, size, evicted = self._depth_limited(start, limit)
+            if path is not None:
+                return self._result(path)
+            if not evicted and size == cached:
+                break
+            if evicted and self.max_limit is None:
+                raise ValueError(
+                    f"IterativeDeepeningSearch: the cache ({self.cache_size} states) overflowed "
+                    f"at limit {limit} and no max_limit is set, so termination cannot be proven; "
+                    "pass max_limit or a larger cache_size")
+            cached = size if not evicted else -1
+            limit += 1
+        return dict(best_cost=math.inf, found=False, expanded=self.expanded)
+
+    def _depth_limited(self, start, limit):
+        depths = {str(start): 0}       # state key -> shallowest depth this iteration
+        by_depth = [{str(start)}]      # depth -> keys cached at that depth
+        evicted = False
+        path = [start]
+        iters = [iter(self._expand(start, 0, 1))]
+
+        while iters:
+            action = next(iters[-1], None)
+            if action is None:
+                iters.pop()
+                path.pop()
+                continue
+
+            depth = len(path)
+            child = self.problem.succ(path[-1], action)
+            key = str(child)
+            if self._seen(depths, key, depth):
+                continue
+
+            if depth > self.max_depth: self.max_depth = depth
+            if self.problem.is_end(child):
+                return path + [child], len(depths), evicted
+            if depth == limit:
+                continue
+
+            old = depths.get(key)
+            if old is not None:
+                by_depth[old].discard(key)
+            elif len(depths) >= self.cache_size:
+                evicted = True
+                deepest = max(d for d, keys in enumerate(by_depth) if keys)
+                if deepest <= depth:
+                    # Every cached state is at least as shallow: expand without caching.
+                    path.append(child)
+                    iters.append(iter(self._expand(child, depth, len(path))))
+                    continue
+                del depths[by_depth[deepest].pop()]
+            while len(by_depth) <= depth:
+                by_depth.append(set())
+            depths[key] = depth
+            by_depth[depth].add(key)
+
+            path.append(child)
+            iters.append(iter(self._expand(child, depth, len(path))))
+        return None, len(depths), evicted
+
+    def _seen(self, depths, key, depth):
+        if self.hooks is None:
+            seen = depths.get(key)
+            return seen is not None and seen <= depth
+        start = time.perf_counter()
+        seen = depths.get(key)
+        self.hooks.on_phase("dedupe", start, time.perf_counter() - start)
+        if seen is not None and seen <= depth:
+            self.hooks.on_duplicate(key)
+            return True
+        return False
+
+    def _expand(self, state, depth, frontier):
+        if self.hooks is not None:
+            self.hooks.on_expand(state, depth, frontier)
+        actions = self.problem.actions(state)
+        self.expanded += 1
+        self.total_actions += len(actions)
+        return actions
+
+    def _result(self, path):
+        depth = len(path) - 1
+        return dict(
+            best_cost=depth,
+            best_path=path,
+            found=True,
+            expanded=self.expanded,
+            solution_depth=depth,             # d
+            max_depth=self.max_depth,         # D
+            avg_branching=self.total_actions / self.expanded if self.expanded else 0
+        )
+
+
+"""
+Parallel, level-synchronous BFS for a single NJugsProblem instance.
+
+Each level of the frontier is split across worker processes. States are packed into
+integers (mixed radix over capacity + 1). Every state has an owner partition chosen from its
+index, (index // 8) % processes, and worker w is the only process that claims the states of
+partition w, so no locking is needed. The visited set is a bitmap in shared memory (each byte
+belongs to one partition); when the bitmap would exceed max_bitmap_bytes or half the free
+space of /dev/shm, or cannot be allocated, every worker keeps a plain set of the states it
+owns instead. (Shared memory on tmpfs is not reserved when it is created: a bitmap larger
+than the free space would be created fine and kill the workers with SIGBUS later.)
+
+A level runs in two phases:
+    expand: worker r sorts its slice of the frontier (contiguous BFS positions), expands it
+            and routes every successor, tagged with (parent position, action index), to
+            its owner.
+    claim:  worker w keeps the successors whose state it has not seen yet. Candidates arrive
+            in frontier order, so the parent kept is the one BFSSearch would have dequeued
+            first. Claimed states are routed to the worker expanding their parent's range
+            of positions on the next level.
+Ordering the next level by (parent position, action index) gives exactly BFSSearch's queue,
+so the returned dictionary is identical to BFSSearch's. The parent process only forwards
+opaque byte blobs and sums per-worker counts; all per-state work happens in the workers.
+
+returns the same dictionary as BFSSearch.
+"""
+
+def _parallel_worker(conn, problem, part, parts, shm_name):
+    caps = problem.capacities
+    strides = [1] * len(caps)
+    for i in range(len(caps) - 2, -1, -1):
+        strides[i] = strides[i + 1] * (caps[i + 1] + 1)
+    width = len(caps) * (len(caps) + 1)  # upper bound on the number of actions of a state
+    shm = shared_memory.SharedMemory(name=shm_name) if shm_name else None
+    bits = shm.buf if shm else None
+    owned = set()
+
+    def decode(index):
+        state = []
+        for s in strides:
+            x, index = divmod(index, s)
+            state.append(x)
+        return tuple(state)
+
+    def expand(base, runs):
+        runs = [(array("Q", c), array("q", k)) for c, k in runs if c]
+        if len(runs) == 1:
+            children, keys = runs[0]
+        else:
+            merged = list(heapq.merge(*(zip(k, c) for c, k in runs)))
+            children = array("Q", (c for _, c in merged))
+            keys = array("q", (k for k, _ in merged))
+
+        buckets = [(array("Q"), array("q")) for _ in range(parts)]
+        goal, total_actions = -1, 0
+        for pos, index in enumerate(children, base):
+            state = decode(index)
+            if problem.is_end(state):
+                # Nothing after the goal is dequeued by BFSSearch: stop here.
+                goal = pos
+                break
+            actions = problem.actions(state)
+            total_actions += len(actions)
+            key = pos * width
+            for a, action in enumerate(actions):
+                child = sum(x * s for x, s in zip(problem.succ(state, action), strides))
+                out_children, out_keys = buckets[(child >> 3) % parts]
+                out_children.append(child)
+                out_keys.append(key + a)
+        return (goal, total_actions, [(c.tobytes(), k.tobytes()) for c, k in buckets],
+                children.tobytes(), keys.tobytes())
+
+    def claim(batches, level_size):
+        buckets = [(array("Q"), array("q")) for _ in range(parts)]
+        counts = [0] * parts
+        for children, keys in batches:
+            for child, key in zip(array("Q", children), array("q", keys)):
+                if bits is not None:
+                    byte, mask = child >> 3, 1 << (child & 7)
+                    if bits[byte] & mask:
+                        continue
+                    bits[byte] |= mask
+                elif child in owned:
+                    continue
+                else:
+                    owned.add(child)
+                r = (key // width) * parts // level_size
+                buckets[r][0].append(child)
+                buckets[r][1].append(key)
+                counts[r] += 1
+        return [(c.tobytes(), k.tobytes()) for c, k in buckets], counts
+
+    try:
+        while True:
+            msg = conn.recv()
+            if msg is None:
+                break
+            op, args = msg
+            conn.send(expand(*args) if op == "expand" else claim(*args))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        bits = None
+        if shm:
+            shm.close()
+
+
+class ParallelBFSSearch:
+    def __init__(self, problem, processes=None, max_bitmap_bytes=1 << 30, hooks=None):
+        self.problem = problem
+        self.processes = processes or os.cpu_count() or 1
+        self.max_bitmap_bytes = max_bitmap_bytes
+        self.hooks = hooks
+
+    def solve(self):
+        size = math.prod(c + 1 for c in self.problem.capacities)
+        if size > 1 << 64:
+            raise ValueError(f"State space of {size} states does not fit in 64-bit state indices.")
+
+        shm = None
+        free = _shm_free_bytes()
+        if size // 8 + 1 <= self.max_bitmap_bytes and (free is None or size // 8 + 1 <= free // 2):
+            try:
+                shm = shared_memory.SharedMemory(create=True, size=size // 8 + 1)
+            except OSError:
+                shm = None  # fall back to per-worker sets
+
+        workers = []
+        try:
+            for part in range(self.processes):
+                conn, child_conn = Pipe()
+                proc = Process(target=_parallel_worker, daemon=True,
+                               args=(child_conn, self.problem, part, self.processes, shm and shm.name))
+                proc.start()
+                child_conn.close()
+                workers.append((proc, conn))
+            return self._search([conn for _, conn in workers])
+        finally:
+            for proc, conn in workers:
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+                proc.join(5)
+                if proc.is_alive():
+                    proc.terminate()
+            if shm:
+                shm.close()
+                shm.unlink()
+
+    def _search(self, conns):
+        n = len(self.problem.capacities)
+        width = n * (n + 1)
+        strides = [1] * n
+        for i in range(n - 2, -1, -1):
+            strides[i] = strides[i + 1] * (self.problem.capacities[i + 1] + 1)
+        parts = len(conns)
+
+        start = self.problem.start_state()
+        start_index = sum(x * s for x, s in zip(start, strides))
+        # The start state is claimed by its owner like any other state.
+        conns[(start_index >> 3) % parts].send(("claim", ([(array("Q", [start_index]).tobytes(),
+                                                            array("q", [0]).tobytes())], 1)))
+        runs, counts = conns[(start_index >> 3) % parts].recv()
+        runs = [[run] for run in runs]
+        level_size = 1
+
+        levels = []  # per level: [(base, children bytes, keys bytes)] used to rebuild the path
+        explored = 1
+        total_actions = 0
+
+        while level_size:
+            bases = [0] * parts
+            for r in range(1, parts):
+                bases[r] = bases[r - 1] + counts[r - 1]
+            phase_start = time.perf_counter()
+            for conn, base, run in zip(conns, bases, runs):
+                conn.send(("expand", (base, run)))
+            expanded = [conn.recv() for conn in conns]
+            if self.hooks is not None:
+                self.hooks.on_phase("expand", phase_start, time.perf_counter() - phase_start)
+
+            goal_pos = -1
+            slices = []
+            batches = [[] for _ in range(parts)]
+            for (found, n_actions, buckets, children, keys), base in zip(expanded, bases):
+                slices.append((base, children, keys))
+                total_actions += n_actions
+                for part, bucket in enumerate(buckets):
+                    batches[part].append(bucket)
+                if found >= 0:
+                    goal_pos = found
+                    break
+            levels.append(slices)
+
+            phase_start = time.perf_counter()
+            for conn, batch in zip(conns, batches):
+                conn.send(("claim", (batch, level_size)))
+            claimed = [conn.recv() for conn in conns]
+            if self.hooks is not None:
+                self.hooks.on_phase("claim", phase_start, time.perf_counter() - phase_start)
+            runs = [[buckets[r] for buckets, _ in claimed] for r in range(parts)]
+            counts = [sum(c[r] for _, c in claimed) for r in range(parts)]
+            explored += sum(counts)
+
+            if goal_pos >= 0:
+                depth = len(levels) - 1
+                path, pos = [], goal_pos
+                for level in reversed(levels):
+                    base, children, keys = max((s for s in level if s[0] <= pos and s[1]),
+                                               key=lambda s: s[0])
+                    index = array("Q", children)[pos - base]
+                    path.append(_parallel_decode(index, strides))
+                    pos = array("q", keys)[pos - base] // width
+                return dict(
+                    best_cost=depth,
+                    best_path=path[::-1],
+                    found=True,
+                    expanded=explored,
+                    solution_depth=depth,     # d
+                    max_depth=depth,          # D
+                    avg_branching=total_actions / explored
+                )
+            level_size = sum(counts)
+        return dict(best_cost=math.inf, found=False, expanded=explored)
+
+
+def _shm_free_bytes():
+    # Free space of the tmpfs backing shared memory, or None where there is no /dev/shm.
+    try:
+        st = os.statvfs("/dev/shm")
+    except (AttributeError, OSError):
+        return None
+    return st.f_bavail * st.f_frsize
+
+
+def _parallel_decode(index, strides):
+    state = []
+    for s in strides:
+        x, index = divmod(index, s)
+        state.append(x)
+    return tuple(state)
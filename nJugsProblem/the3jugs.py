@@ -20,6 +20,51 @@ class SearchProblem:
         raise NotImplementedError()
 
 
+"""
+Goal predicates accepted by NJugsProblem in place of a single goal tuple.
+
+Each one is called with a state and returns True when the state satisfies the goal,
+so a single search answers e.g. "get exactly X litres in any jug" instead of one
+search per candidate goal tuple. They are plain classes (not lambdas) so problems
+stay picklable for ParallelBFSSearch.
+"""
+
+class AnyJugEquals:
+    def __init__(self, amount):
+        self.amount = int(amount)
+
+    def __call__(self, state):
+        return self.amount in state
+
+    def __repr__(self):
+        return f"AnyJugEquals({self.amount})"
+
+
+class TotalEquals:
+    def __init__(self, amount):
+        self.amount = int(amount)
+
+    def __call__(self, state):
+        return sum(state) == self.amount
+
+    def __repr__(self):
+        return f"TotalEquals({self.amount})"
+
+
+class GoalSet:
+    # Any of a set of acceptable goal tuples, checked with a frozenset lookup.
+    def __init__(self, goals):
+        self.goals = frozenset(tuple(int(x) for x in g) for g in goals)
+        if not self.goals:
+            raise ValueError("Goal must be provided.")
+
+    def __call__(self, state):
+        return state in self.goals
+
+    def __repr__(self):
+        return f"GoalSet({sorted(self.goals)})"
+
+
 # Action = of type Tuple[str, int, Optional[int]]  # ('fill', i, None) | ('empty', i, None) | ('pour', i, j)
 # State = of type Tuple[int, ...] 
 
@@ -33,6 +78,9 @@ class NJugsProblem(SearchProblem):
 
     State is an N-tuple of amounts (non-negative ints).
     Cost per action defaults to 1 (can be changed with cost_per_move).
+
+    The goal is either an exact N-tuple, a set of acceptable N-tuples, or a predicate
+    called with the state (see AnyJugEquals, TotalEquals and GoalSet).
     """
 
     def __init__(self, capacities, goal):
@@ -41,23 +89,32 @@ class NJugsProblem(SearchProblem):
             raise ValueError("All capacities must be positive integers.")
 
 
-        if not goal:
+        if goal is None or (not callable(goal) and len(goal) == 0):
             raise ValueError("Goal must be provided.")
 
-        goal = tuple(int(x) for x in goal)
-        if len(goal) != len(capacities):
-            raise ValueError("Goal length must match number of capacities (", len(capacities), ").")
-
         self.capacities = caps
         self.n = len(caps)
-        self._goal = tuple(goal)
+
+        if isinstance(goal, (set, frozenset, GoalSet)):
+            self._goal = goal if isinstance(goal, GoalSet) else GoalSet(goal)
+            for g in self._goal.goals:
+                if len(g) != self.n:
+                    raise ValueError("Goal length must match number of capacities (", self.n, ").")
+        elif callable(goal):
+            # Predicate goal (e.g. AnyJugEquals(x), TotalEquals(x)).
+            self._goal = goal
+        else:
+            goal = tuple(int(x) for x in goal)
+            if len(goal) != len(capacities):
+                raise ValueError("Goal length must match number of capacities (", len(capacities), ").")
+            self._goal = goal
 
     # ---- SearchProblem API ----
     def start_state(self):
         return tuple(0 for _ in range(self.n))
 
     def is_end(self, state):
-        return state == self._goal
+        return self._goal(state) if callable(self._goal) else state == self._goal
 
     def cost(self, state, action) -> int:
         # Unit cost per move by default 1.
@@ -121,6 +178,7 @@ class NJugsProblem(SearchProblem):
 
     @property
     def goal(self):
+        # The exact goal tuple, or the GoalSet / predicate the problem was built with.
         return self._goal
 
     @property
@@ -1,7 +1,21 @@
 import csv
+import heapq
 
-## TO DO: Create a class Player
-#         Attributes: alias, points
+"""
+    A player of the game.
+    __slots__ keeps each instance small (no per-object __dict__),
+    which matters when a game holds millions of players.
+
+"""
+class Player:
+    __slots__ = ("alias", "points")
+
+    def __init__(self, alias:str, points:int = 0):
+        self.alias = alias
+        self.points = points
+
+    def __repr__(self):
+        return f"Player({self.alias!r}, {self.points})"
 
 class SomeGame:
     """
@@ -13,7 +27,12 @@ class SomeGame:
     def __init__(self, title, num_players):
         self.title = title
         self.num_players = num_players
-        self.players =  list()
+        # Alias index: alias -> Player, O(1) lookup
+        self.players = dict()
+        # Leaderboard: heap of (-points, alias), best player on top.
+        # Entries are not removed on update; stale ones are skipped
+        # when they reach the top and dropped when the heap is rebuilt.
+        self.leaderboard = list()
 
 
     """
@@ -36,14 +55,111 @@ class SomeGame:
 
 
     """
-        Define a function that creates 'num_players' players
-        using the class defined above.
-        Function name: add_players
-        Arguments: list of dictionaries with player information `player_list`
+        Creates players from an iterable of dictionaries with player
+        information (or Player objects). An alias that already exists
+        gets its points updated instead.
+        Existing aliases are updated as they come (update_points pushes
+        onto the leaderboard, which is a valid heap throughout). New
+        players are collected and added at the end: pushed one at a
+        time, O(log n) each, when there are few of them, or appended
+        and heapified once, O(n), for a bulk load such as load_csv.
+
+    """
+    def add_players(self, player_list):
+        new = []
+        for info in player_list:
+            if isinstance(info, Player):
+                alias, points = info.alias, info.points
+            else:
+                alias, points = info["alias"], int(info["points"])
+            if alias in self.players:
+                self.update_points(alias, points)
+            else:
+                self.players[alias] = Player(alias, points)
+                new.append((-points, alias))
+        # k pushes cost k log n, a heapify n + k: push unless k log n is larger
+        size = len(self.leaderboard)
+        if len(new) * max(1, size.bit_length()) <= size:
+            for entry in new:
+                heapq.heappush(self.leaderboard, entry)
+        else:
+            self.leaderboard.extend(new)
+            heapq.heapify(self.leaderboard)
+        self.num_players = len(self.players)
+
+
+    def get_player(self, alias:str) -> Player:
+        return self.players.get(alias)
+
+
+    """
+        Sets a player's points: O(log n) push of the new entry, the
+        old one becomes stale. The heap is rebuilt from the players
+        once stale entries outnumber live ones.
+
+    """
+    def update_points(self, alias:str, points:int) -> Player:
+        player = self.players[alias]
+        player.points = points
+        heapq.heappush(self.leaderboard, (-points, alias))
+        if len(self.leaderboard) > 2 * len(self.players) + 64:
+            self.leaderboard = [(-p.points, p.alias) for p in self.players.values()]
+            heapq.heapify(self.leaderboard)
+        return player
+
+
+    ## Top k players by points (ties broken by alias), O(k log n)
+    def top_k(self, k:int) -> list:
+        best, seen = [], set()
+        while self.leaderboard and len(best) < k:
+            entry = heapq.heappop(self.leaderboard)
+            neg_points, alias = entry
+            if alias not in seen and self.players[alias].points == -neg_points:
+                seen.add(alias)
+                best.append(entry)
+        for entry in best:
+            heapq.heappush(self.leaderboard, entry)
+        return [self.players[alias] for _, alias in best]
+
+
+    """
+        Streams players from a CSV file with an "Alias,Points" header.
+        Rows are read one at a time; only the Player objects are kept.
+        Blank lines are skipped. A malformed row (not exactly an alias
+        and an integer) is skipped too and returned as (line number, row),
+        or raises ValueError naming its line if strict is True.
 
     """
-    # def ...
-        # add element to a list: aList.append(object)
+    def load_csv(self, path:str, strict:bool = False) -> list:
+        malformed = []
+
+        def rows(reader):
+            for row in reader:
+                if not row:
+                    continue
+                try:
+                    alias, points = row
+                    if not alias:
+                        raise ValueError("empty alias")
+                    yield {"alias": alias, "points": int(points)}
+                except ValueError:
+                    if strict:
+                        raise ValueError(f"{path}, line {reader.line_num}: malformed row {row!r}") from None
+                    malformed.append((reader.line_num, row))
+
+        with open(path, "r", newline="") as csvfile:
+            reader = csv.reader(csvfile)
+            next(reader, None)
+            self.add_players(rows(reader))
+        return malformed
+
+
+    ## Streams all players (in the order they were added) to a CSV file
+    def export_csv(self, path:str):
+        with open(path, "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["Alias", "Points"])
+            writer.writerows((p.alias, p.points) for p in self.players.values())
 
 
 ## To prevent executing the code if the file is not
@@ -77,20 +193,22 @@ if __name__ == "__main__":
     print(game.welcome_message())
 
     ## ----- Create player objects
-    # game.add_players()
+    game.add_players(list_of_players)
 
     ## ----- Create a sample CSV file and write player information
     with open("player_data.csv", "w", newline="") as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(["Alias", "Points"])
-        ## This assumes only two players.
-        #  Re-write it to use a loop instead that
-        #  displays the list of players: list_of_players
-        writer.writerow([player1["alias"], player1["points"]])
-        writer.writerow([player2["alias"], player2["points"]])
-
-    ## ----- Read the CSV file
-    with open("player_data.csv", "r") as csvfile:
-        reader = csv.reader(csvfile)
-        for row in reader:
-            print("CSV Row:", row)
+        for player in list_of_players:
+            writer.writerow([player["alias"], player["points"]])
+
+    ## ----- Read the CSV file into a new game and show the leaderboard
+    other = SomeGame(title, 0)
+    for line, row in other.load_csv("player_data.csv"):
+        print(f"Skipped malformed row on line {line}: {row}")
+    for rank, player in enumerate(other.top_k(10), start=1):
+        print(f"   #{rank}: {player.alias} ({player.points} points)")
+
+    ## ----- Points change incrementally
+    other.update_points("player1", 7)
+    print("Leader:", other.top_k(1)[0])